@@ -6,7 +6,9 @@ SPDX-License-Identifier: BSD-3-Clause
 
 """
 
-from typing import List, Optional, Union
+import sys
+from dataclasses import astuple
+from typing import Hashable, List, Optional, Union
 
 from ftanalyzer.models.sm_data_types import (
     SMMetricType,
@@ -31,6 +33,8 @@ class StatisticalReport:
     def __init__(self) -> None:
         """Basic init."""
         self.tests = []
+        self._index = {}
+        self._failed = []
 
     def add_test(self, test: SMTestOutcome) -> None:
         """Append the performed test into the report.
@@ -41,6 +45,10 @@ class StatisticalReport:
             Test to be added into the report.
         """
         self.tests.append(test)
+        # keep the first test for the metric and segment, as the previous linear search did
+        self._index.setdefault((test.metric.key, self._segment_key(test.segment)), test)
+        if not test.is_passing():
+            self._failed.append(test)
 
     def is_passing(self) -> bool:
         """Get information whether all performed tests passed.
@@ -50,7 +58,7 @@ class StatisticalReport:
         bool
             True - all tests passed, False - some tests failed
         """
-        return all(test.is_passing() for test in self.tests)
+        return not self._failed
 
     def get_failed(self) -> List[SMTestOutcome]:
         """Get list of failed tests.
@@ -60,7 +68,7 @@ class StatisticalReport:
         list
             List of failed tests.
         """
-        return [test for test in self.tests if not test.is_passing()]
+        return list(self._failed)
 
     def get_test(
         self, metric: SMMetricType, segment: Optional[Union[SMSubnetSegment, SMTimeSegment]] = None
@@ -80,20 +88,39 @@ class StatisticalReport:
             Test which satisfies the criteria. None if a test could not be found.
         """
 
-        for test in self.tests:
-            if test.metric.key == metric and test.segment == segment:
-                return test
+        return self._index.get((metric, self._segment_key(segment)))
 
-        return None
+    @staticmethod
+    def _segment_key(segment: Optional[Union[SMSubnetSegment, SMTimeSegment, str]]) -> Hashable:
+        """Convert segment to a hashable key. Segment dataclasses are mutable and therefore not hashable.
+
+        Parameters
+        ----------
+        segment: SMSubnetSegment, SMTimeSegment, str, None
+            Segment that was used in the test (if any).
+
+        Returns
+        ------
+        Hashable
+            Key which is equal for equal segments.
+        """
+
+        if segment is None or isinstance(segment, str):
+            return segment
+
+        return (type(segment), *astuple(segment))
 
     def print_results(self) -> None:
         """Print results of all tests to stdout."""
 
-        print()
+        err_clr = self.ERR_CLR
+        rst_clr = self.RST_CLR
+
+        # leading empty line separates results from preceding output
+        lines = [""]
         for test in self.tests:
-            test_str = ""
-            if not test.is_passing():
-                test_str = f"{self.ERR_CLR}"
+            passing = test.is_passing()
+            test_str = "" if passing else err_clr
 
             if test.segment is None:
                 test_str += "ALL DATA"
@@ -104,7 +131,9 @@ class StatisticalReport:
                 f"\t{test.metric.key.value}\t{test.diff:.4f}/"
                 f"{test.metric.diff:.4f}\t({test.value}/{test.reference})"
             )
-            if not test.is_passing():
-                test_str += f"{self.RST_CLR}"
+            if not passing:
+                test_str += rst_clr
+
+            lines.append(test_str)
 
-            print(test_str)
+        sys.stdout.write("\n".join(lines) + "\n")
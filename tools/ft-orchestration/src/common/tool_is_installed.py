@@ -8,12 +8,37 @@ Check that tool is installed/available on machine.
 """
 
 import logging
-from typing import Any
+from typing import Any, Optional
 
 from lbr_testsuite.executable import Tool
 from lbr_testsuite.executable.executor import Executor
 
 
+def get_tool_path(tool: Any, executor: Executor) -> Optional[str]:
+    """Get absolute path to tool if it is installed/available on machine.
+
+    Parameters
+    ----------
+    tool : str
+        Name of tool/binary to check.
+    executor : Executor
+        Executor for command execution.
+
+    Returns
+    -------
+    str or None
+        Absolute path to ``tool``. None if tool is not installed on machine.
+    """
+
+    cmd = Tool(f"command -v {tool}", failure_verbosity="no-exception", executor=executor)
+    stdout, _ = cmd.run()
+
+    if cmd.returncode() != 0:
+        return None
+
+    return stdout.strip()
+
+
 def assert_tool_is_installed(tool: Any, executor: Executor) -> None:
     """Assert tool is installed/available on machine.
 
@@ -35,11 +60,10 @@ def assert_tool_is_installed(tool: Any, executor: Executor) -> None:
         If tool is not installed on machine.
     """
 
-    cmd = Tool(f"command -v {tool}", failure_verbosity="no-exception", executor=executor)
-    stdout, _ = cmd.run()
+    tool_path = get_tool_path(tool, executor)
 
-    if cmd.returncode() != 0:
+    if tool_path is None:
         logging.getLogger().error("%s is missing on host %s", tool, executor.get_host())
         raise RuntimeError(f"{tool} is missing on host {executor.get_host()}")
 
-    return stdout.strip()
+    return tool_path
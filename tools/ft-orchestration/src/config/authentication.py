@@ -33,8 +33,14 @@ class AuthenticationCfg(YAMLWizard):
     password: Optional[str] = None
     ssh_agent: bool = False
 
+    def __post_init__(self):
+        self._checked = False
+
     def check(self) -> None:
-        """Check the configuration validity."""
+        """Check the configuration validity. Configuration is validated only once."""
+        if self._checked:
+            return
+
         if self.key_path and self.password:
             raise AuthenticationCfgException(
                 "AuthenticationCfg config file can not contain both of the key_path and the password."
@@ -51,6 +57,8 @@ class AuthenticationCfg(YAMLWizard):
         if self.key_path:
             self._check_key_path()
 
+        self._checked = True
+
     def _check_key_path(self) -> None:
         if not exists(self.key_path):
             raise AuthenticationCfgException(f"Key file {self.key_path} was not found.")
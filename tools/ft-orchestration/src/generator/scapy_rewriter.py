@@ -7,20 +7,41 @@ SPDX-License-Identifier: BSD-3-Clause
 Tool for editing packets in PCAP file. Similar to tcpreplay-edit or tcprewrite, but with limited editing options.
 """
 
+import mmap
+import shutil
+import struct
+import zlib
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 
 from scapy.layers.all import (  # pylint: disable=no-name-in-module
     ETHER_TYPES,
+    IP,
+    TCP,
+    UDP,
     Dot1Q,
     Ether,
+    IPv6,
+    IPv6ExtHdrFragment,
 )
 from scapy.main import load_contrib
 from scapy.packet import Packet
-from scapy.utils import rdpcap, wrpcap
+from scapy.utils import PcapReader, PcapWriter, rdpcap, wrpcap
 
 load_contrib("mpls")
 
+# Magic numbers of classic pcap format (microsecond and nanosecond resolution) and their byte order.
+_PCAP_BYTE_ORDER = {
+    b"\xd4\xc3\xb2\xa1": "<",
+    b"\x4d\x3c\xb2\xa1": "<",
+    b"\xa1\xb2\xc3\xd4": ">",
+    b"\xa1\xb2\x3c\x4d": ">",
+}
+_PCAP_HEADER_LEN = 24
+_PCAP_RECORD_HEADER_LEN = 16
+_LINKTYPE_ETHERNET = 1
+
 
 @dataclass
 class RewriteRules:
@@ -56,6 +77,11 @@ def rewrite_pcap(pcap_path: str, rules: RewriteRules, output_pcap_path: str) ->
         Path to new PCAP file.
     """
 
+    # destination mac is at fixed offset of each packet, pcap is patched in place without parsing packets
+    if rules.add_vlan is None and rules.edit_dst_mac:
+        if _fast_rewrite_pcap(pcap_path, rules.edit_dst_mac, output_pcap_path):
+            return output_pcap_path
+
     res_packets = []
     for packet in rdpcap(pcap_path):
         res_packets.append(edit_packet(packet, rules))
@@ -65,6 +91,132 @@ def rewrite_pcap(pcap_path: str, rules: RewriteRules, output_pcap_path: str) ->
     return output_pcap_path
 
 
+def _fast_rewrite_pcap(pcap_path: str, dst_mac: str, output_pcap_path: str) -> bool:
+    """Replace destination mac address in all packets by patching bytes of PCAP file copy.
+
+    Only classic PCAP files with ethernet link type are supported.
+
+    Parameters
+    ----------
+    pcap_path : str
+        Path to original PCAP file.
+    dst_mac : str
+        Destination mac address.
+    output_pcap_path : str
+        Path to save new PCAP.
+
+    Returns
+    -------
+    bool
+        True if PCAP was rewritten, False if PCAP format is not supported.
+    """
+
+    mac = bytes.fromhex(dst_mac.replace(":", "").replace("-", ""))
+    shutil.copyfile(pcap_path, output_pcap_path)
+
+    with open(output_pcap_path, "r+b") as pcap_file:
+        if Path(output_pcap_path).stat().st_size < _PCAP_HEADER_LEN:
+            return False
+
+        with mmap.mmap(pcap_file.fileno(), 0) as data:
+            byte_order = _PCAP_BYTE_ORDER.get(data[:4])
+            if byte_order is None:
+                return False
+            link_type = struct.unpack_from(f"{byte_order}I", data, 20)[0] & 0xFFFF
+            if link_type != _LINKTYPE_ETHERNET:
+                return False
+
+            # incl_len field of record header
+            record_len = struct.Struct(f"{byte_order}8xI4x")
+            offset = _PCAP_HEADER_LEN
+            while offset + _PCAP_RECORD_HEADER_LEN <= len(data):
+                (incl_len,) = record_len.unpack_from(data, offset)
+                offset += _PCAP_RECORD_HEADER_LEN
+                if incl_len < len(mac) or offset + incl_len > len(data):
+                    return False
+                data[offset : offset + len(mac)] = mac
+                offset += incl_len
+
+    return True
+
+
+def split_pcap(pcap_path: str, count: int, output_dir: str) -> list[str]:
+    """Split packets from the PCAP file by flows into multiple PCAP files.
+
+    Packets of one flow (in both directions) are always stored in the same file.
+    Packets without IP layer are stored in the first file.
+
+    Parameters
+    ----------
+    pcap_path : str
+        Path to original PCAP file.
+    count : int
+        Number of output PCAP files.
+    output_dir : str
+        Directory to save new PCAPs.
+
+    Returns
+    -------
+    list
+        Paths to new PCAP files. Files without any packet are omitted.
+    """
+
+    stem = Path(pcap_path).stem
+    output_paths = [str(Path(output_dir, f"{stem}_{idx}.pcap")) for idx in range(count)]
+    writers = [PcapWriter(output_path) for output_path in output_paths]
+    used = [False] * count
+
+    try:
+        with PcapReader(pcap_path) as reader:
+            for packet in reader:
+                idx = flow_hash(packet) % count
+                writers[idx].write(packet)
+                used[idx] = True
+    finally:
+        for writer in writers:
+            writer.close()
+
+    return [output_path for output_path, is_used in zip(output_paths, used) if is_used]
+
+
+def flow_hash(packet: Packet) -> int:
+    """Compute hash of packet flow. Hash is same for both directions of the flow.
+    Fragmented packets are hashed without ports, so all fragments of datagram have the same hash.
+
+    Parameters
+    ----------
+    packet : Packet
+        Packet loaded by Scapy.
+
+    Returns
+    -------
+    int
+        Flow hash. Zero for packets without IP layer.
+    """
+
+    if IP in packet:
+        ip_layer = packet[IP]
+        protocol = ip_layer.proto
+        fragmented = ip_layer.flags.MF or ip_layer.frag > 0
+    elif IPv6 in packet:
+        ip_layer = packet[IPv6]
+        fragmented = IPv6ExtHdrFragment in packet
+        protocol = packet[IPv6ExtHdrFragment].nh if fragmented else ip_layer.nh
+    else:
+        return 0
+
+    # only first fragment contains ports, all fragments of datagram are hashed without ports
+    src_port = dst_port = 0
+    for l4_layer in (TCP, UDP):
+        if l4_layer in packet and not fragmented:
+            src_port, dst_port = packet[l4_layer].sport, packet[l4_layer].dport
+            break
+
+    endpoints = sorted([(ip_layer.src, src_port), (ip_layer.dst, dst_port)])
+
+    return zlib.crc32(repr((endpoints, protocol)).encode())
+
+
 def edit_packet(packet: Packet, rules: RewriteRules) -> Packet:
     """Rewrite single packet.
 
@@ -7,14 +7,17 @@ SPDX-License-Identifier: BSD-3-Clause
 Module implements TcpReplay class representing tcpreplay tool.
 """
 
+import copy
 import datetime
+import json
 import logging
 import re
 import shutil
 import tempfile
-from os import path
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 from lbr_testsuite.executable import (
     AsyncTool,
@@ -23,7 +26,8 @@ from lbr_testsuite.executable import (
     Rsync,
     Tool,
 )
-from src.common.tool_is_installed import assert_tool_is_installed
+from src.common.tool_is_installed import assert_tool_is_installed, get_tool_path
+from src.common.typed_dataclass import bool_convertor
 from src.generator.ft_generator import FtGenerator, FtGeneratorConfig
 from src.generator.interface import (
     GeneratorException,
@@ -35,7 +39,41 @@ from src.generator.interface import (
     ReplaySpeed,
     TopSpeed,
 )
-from src.generator.scapy_rewriter import RewriteRules, rewrite_pcap
+from src.generator.scapy_rewriter import RewriteRules, rewrite_pcap, split_pcap
+
+# Single pattern matching all interesting parts of tcpreplay output. Output is walked only once.
+_STATS_RE = re.compile(
+    r"(?P<packets>\d+) packets|(?P<bytes>\d+) bytes|Test start: (?P<start>.*) \.\.\.|Test complete: (?P<end>.*)"
+)
+# Statistics line printed periodically (option --stats) and at the end of replay.
+_PROGRESS_RE = re.compile(
+    r"Actual: (?P<packets>\d+) packets \((?P<bytes>\d+) bytes\) sent in (?P<seconds>[\d.]+) seconds"
+)
+
+
+@dataclass
+class _ReplayInterface:
+    """Internal representation of replaying interface.
+
+    Parameters
+    ----------
+    name : str
+        String name of interface, e.g. os name or pci address.
+    dst_mac : str, optional
+        Destination mac address set in packets replayed on interface.
+    cmd_prefix : str
+        Part of tcpreplay command which does not change between runs.
+    rewrite_rules : RewriteRules, optional
+        Rules for scapy rewriter, used when tcpreplay-edit is not available.
+    configured : bool
+        True when interface state and mtu were already checked (and set if needed).
+    """
+
+    name: str
+    dst_mac: Optional[str] = None
+    cmd_prefix: str = ""
+    rewrite_rules: Optional[RewriteRules] = None
+    configured: bool = False
 
 
 # pylint: disable=too-many-instance-attributes
@@ -61,8 +99,30 @@ class TcpReplay(PcapPlayer):
         Default size is defined by standard MTU with ethernet and VLAN header.
     cache_path : str, optional
         Custom cache path for PCAPs generated by ft-generator on (remote) host.
+    use_netmap : bool, optional
+        If True, packets are sent directly to netmap enabled network adapter, bypassing the kernel network stack.
+        Netmap takes exclusive control of the interface while tcpreplay is running.
+        Ignored with warning if tcpreplay on host is built without netmap support.
+    cpus : list or str, optional
+        CPU cores to which tcpreplay processes are pinned (taskset). When traffic is replayed
+        by multiple processes (shards), cores are assigned in round robin. No pinning by default.
+        Comma separated string of cores (e.g. "0,1") is accepted, as used in command line arguments.
     """
 
+    # tcpreplay argument names of supported replay speed modifiers
+    _SPEED_ARGS = {
+        MultiplierSpeed: "multiplier",
+        MbpsSpeed: "mbps",
+        PpsSpeed: "pps",
+        TopSpeed: "topspeed",
+    }
+
+    # (host, tool) -> path of tool on host or None if tool is missing, shared by all instances
+    _tool_paths = {}
+
+    # host -> True if tcpreplay on host supports netmap, shared by all instances
+    _netmap_support = {}
+
     # pylint: disable=super-init-not-called
     def __init__(
         self,
@@ -72,25 +132,42 @@ class TcpReplay(PcapPlayer):
         biflow_export: bool = False,
         mtu: int = 1522,
         cache_path: str = None,
+        use_netmap: bool = False,
+        cpus: Optional[Union[list[int], str]] = None,
     ):
         self._executor = executor
         self._rsync = Rsync(executor)
         self._vlan = add_vlan
-        self._interface = None
-        self._dst_mac = None
+        self._interfaces = []
         self._verbose = verbose
         self._mtu = mtu
-        self._process = None
-        self._pcap_path = ""
+        if isinstance(cpus, str):
+            cpus = cpus.split(",")
+        self._cpus = [int(cpu) for cpu in cpus or []]
+        # executor maintains single process, each tcpreplay process (shard) uses its own executor
+        self._executors = [executor]
+        self._processes = []
+        self._log_files = []
+        # local pcap path -> (mtime, size, remote pcap path) of pcaps already pushed to host
+        self._pushed_pcaps = {}
+        # rsync to directory on host owned by this instance, created with first pushed pcap
+        self._pcap_rsync = None
+        # source pcap key -> rewritten pcap path of pcaps rewritten by scapy
+        self._rewritten_pcaps = {}
+        # (source pcap key, shard paths) of the last split pcap
+        self._split_pcap = None
         self._ft_generator = FtGenerator(executor, cache_path, biflow_export, verbose)
 
         self._bin = "tcpreplay"
-        assert_tool_is_installed(self._bin, executor)
+        self._get_tool_path(self._bin, executor, required=True)
+        # tcpreplay-edit rewrites packets natively, scapy rewriter is used as a fallback
+        self._bin_edit = "tcpreplay-edit" if self._get_tool_path("tcpreplay-edit", executor) else None
+        self._netmap = bool_convertor(use_netmap) and self._netmap_supported(executor)
         self._work_dir = tempfile.mkdtemp()
-        self._log_file = Path(self._work_dir, "tcpreplay.log")
 
     def add_interface(self, ifc_name: str, dst_mac: Optional[Union[str, list[str]]] = None):
         """Add interface on which traffic will be replayed.
+        Multiple interfaces can be added, pcap is then split by flows among interfaces.
 
         Parameters
         ----------
@@ -105,22 +182,23 @@ class TcpReplay(PcapPlayer):
         Raises
         ------
         RuntimeError
-            If more than one interface is added.
+            If interface was already added or multiple mac addresses are used.
         """
 
-        if self._interface:
-            raise RuntimeError("Tcpreplay generator supports only one replaying interface.")
+        if any(ifc.name == ifc_name for ifc in self._interfaces):
+            raise RuntimeError(f"Tcpreplay replaying interface {ifc_name} was already added.")
 
-        self._interface = ifc_name
         if isinstance(dst_mac, list):
             if len(dst_mac) == 1:
-                self._dst_mac = dst_mac[0]
+                dst_mac = dst_mac[0]
             elif len(dst_mac) == 0:
-                self._dst_mac = None
+                dst_mac = None
             else:
                 raise RuntimeError("Tcpreplay does not support multiple destination mac addresses.")
-        else:
-            self._dst_mac = dst_mac
+
+        interface = _ReplayInterface(ifc_name, dst_mac)
+        self._prepare_cmd(interface)
+        self._interfaces.append(interface)
 
     # pylint: disable=arguments-differ
     def start(
@@ -128,6 +206,8 @@ class TcpReplay(PcapPlayer):
         pcap_path: str,
         speed: ReplaySpeed = MultiplierSpeed(1.0),
         loop_count: int = 1,
+        stats_interval: Optional[int] = None,
+        shards: Optional[int] = None,
     ):
         """Start tcpreplay with given command line options.
 
@@ -143,67 +223,77 @@ class TcpReplay(PcapPlayer):
         loop_count : int, optional
             Packets from pcap will be replayed loop_count times.
             Zero or negative value means infinite loop.
+        stats_interval : int, optional
+            If specified, tcpreplay prints statistics every stats_interval seconds.
+            Statistics can be read continuously with ``stats_stream`` method.
+            Statistics are printed after each loop by default.
+        shards : int, optional
+            Number of tcpreplay processes replaying traffic in parallel. Pcap is split by flows
+            into shards, shards are assigned to interfaces and CPU cores in round robin.
+            By default, one shard is replayed on each interface.
+            Constant rate speed (mbps, pps) is divided evenly among shards, so the total rate is kept.
+            Timing of each shard starts from its own first packet, thus with multiplier speed
+            flows in later shards are shifted earlier relative to the original pcap.
 
         Raises
         ------
         RuntimeError
-            If tcpreplay or tcpreplay-edit is missing or
-            output interface was not specified.
+            If tcpreplay or tcpreplay-edit is missing,
+            output interface was not specified, number of shards is not positive
+            or packets per second speed is lower than number of shards.
         GeneratorException
             Tcpreplay process exited unexpectedly with an error.
         """
 
-        if self._process is not None:
-            if self._process.is_running():
-                self.stop()
+        if any(process.is_running() for process in self._processes):
+            self.stop()
 
-        if not self._interface:
+        if not self._interfaces:
             logging.getLogger().error("no output interface was specified")
             raise RuntimeError("no output interface was specified")
 
+        shards = len(self._interfaces) if shards is None else shards
+        if shards < 1:
+            logging.getLogger().error("number of shards must be positive")
+            raise RuntimeError("number of shards must be positive")
+
         # negative values mean infinite loop
         loop_count = max(loop_count, 0)
 
-        rewrite_rules = None
-        if self._dst_mac or self._vlan is not None:
-            rewrite_rules = RewriteRules()
-            if self._dst_mac:
-                rewrite_rules.edit_dst_mac = self._dst_mac
-            if self._vlan is not None:
-                rewrite_rules.add_vlan = self._vlan
-
-        cmd_options = []
-        cmd_options += [self._get_speed_arg(speed)]
-        cmd_options += [f"--loop={loop_count}"]
-        cmd_options += ["--preload-pcap"]  # always preload pcap file
-        cmd_options += [f"--intf1={self._interface}"]
-        if self._verbose:
-            cmd_options += ["-v"]
-        cmd_options += ["--stats=0"]
-
-        Tool(f"ip link set dev {self._interface} up", executor=self._executor, sudo=True).run()
-        Tool(f"ip link set dev {self._interface} mtu {self._mtu}", executor=self._executor, sudo=True).run()
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if rewrite_rules:
-                pcap_path = rewrite_pcap(
-                    pcap_path,
-                    rewrite_rules,
-                    path.join(temp_dir, path.basename(pcap_path)),
-                )
-
-            self._pcap_path = self._rsync.push_path(pcap_path)
-            self._process = AsyncTool(
-                f"{self._bin} {' '.join(cmd_options)} {self._pcap_path}",
-                sudo=True,
-                executor=self._executor,
-            )
-            self._process.set_outputs(self._log_file)
-
-            try:
-                self._process.run()
-            except ExecutableProcessError as err:
-                raise GeneratorException("tcpreplay startup error") from err
+        # working directory is removed by cleanup, instance can still be reused
+        Path(self._work_dir).mkdir(parents=True, exist_ok=True)
+
+        for interface in self._interfaces:
+            if not interface.configured:
+                self._configure_interface(interface)
+
+        shard_paths = [pcap_path] if shards == 1 else self._split(pcap_path, shards)
+        # empty shards are omitted, speed is divided only among shards actually replayed
+        shard_speeds = self._split_speed(speed, len(shard_paths))
+
+        # prepare and push all shards first, so tcpreplay processes are started at the same time
+        commands = []
+        for idx, shard_path in enumerate(shard_paths):
+            interface = self._interfaces[idx % len(self._interfaces)]
+            if interface.rewrite_rules:
+                shard_path = self._rewrite_pcap(shard_path, interface.rewrite_rules)
+
+            cmd_options = f"{self._get_speed_arg(shard_speeds[idx])} --loop={loop_count} --stats={stats_interval or 0}"
+            cmd = f"{interface.cmd_prefix} {cmd_options} {self._push_pcap(shard_path)}"
+            if self._cpus:
+                cmd = f"taskset -c {self._cpus[idx % len(self._cpus)]} {cmd}"
+            commands.append(cmd)
+
+        # executors are copied before any shard is started, so copies do not hold process of a running shard
+        while len(self._executors) < len(commands):
+            executor = copy.copy(self._executor)
+            executor.reset_process()
+            self._executors.append(executor)
+
+        self._processes = []
+        self._log_files = []
+        for idx, cmd in enumerate(commands):
+            self._run(idx, cmd)
 
     def start_profile(
         self,
@@ -234,6 +324,8 @@ class TcpReplay(PcapPlayer):
 
         pcap, report = self._ft_generator.generate(profile_path, generator_config)
 
+        Path(self._work_dir).mkdir(parents=True, exist_ok=True)
+
         pcap = self._rsync.pull_path(pcap, self._work_dir)
         report = self._rsync.pull_path(report, self._work_dir)
 
@@ -244,32 +336,136 @@ class TcpReplay(PcapPlayer):
     def stats(self) -> GeneratorStats:
         """Get stats based on process from ``start`` method.
 
-        This method will block until tcpreplay stops.
+        This method will block until tcpreplay stops. Statistics of
+        all tcpreplay processes (shards) are summed up.
 
         Returns
         -------
         GeneratorStats
             Class containing statistics of sent packets and bytes.
+
+        Raises
+        ------
+        GeneratorException
+            Statistics were not found in tcpreplay output.
         """
 
-        self._process.wait_or_kill()
-        output = Path(self._log_file).read_text(encoding="utf-8")
+        for process in self._processes:
+            process.wait_or_kill()
+
+        shard_stats = [self._parse_stats(log_file) for log_file in self._log_files]
+
+        return GeneratorStats(
+            sum(stats.packets for stats in shard_stats),
+            sum(stats.bytes for stats in shard_stats),
+            min(stats.start_time for stats in shard_stats),
+            max(stats.end_time for stats in shard_stats),
+        )
 
-        pkts = int(re.findall(r"(\d+) packets", output)[-1])
-        bts = int(re.findall(r"(\d+) bytes", output)[-1])
+    @classmethod
+    def _parse_stats(cls, log_file: Path) -> GeneratorStats:
+        """Parse statistics from tcpreplay output.
+
+        Parameters
+        ----------
+        log_file : Path
+            Log file with tcpreplay output.
 
-        start_time = re.findall(r"Test start: (.*) ...", output)[0].strip()
-        start_time = start_time[:26]  # reduce nanosec precision to microsec precision
-        start_time = datetime.datetime.fromisoformat(start_time)
-        start_time = int(start_time.timestamp() * 1000)
+        Returns
+        -------
+        GeneratorStats
+            Class containing statistics of sent packets and bytes.
+
+        Raises
+        ------
+        GeneratorException
+            Statistics were not found in tcpreplay output.
+        """
 
-        end_time = re.findall(r"Test complete: (.*)", output)[0].strip()
-        end_time = end_time[:26]
-        end_time = datetime.datetime.fromisoformat(end_time)
-        end_time = int(end_time.timestamp() * 1000)
+        output = log_file.read_text(encoding="utf-8")
+
+        pkts = bts = start_time = end_time = None
+        for match in _STATS_RE.finditer(output):
+            group = match.lastgroup
+            if group == "packets":
+                pkts = match.group(group)
+            elif group == "bytes":
+                bts = match.group(group)
+            elif group == "start" and start_time is None:
+                start_time = match.group(group)
+            elif group == "end" and end_time is None:
+                end_time = match.group(group)
+
+        if None in (pkts, bts, start_time, end_time):
+            logging.getLogger().error("unable to parse statistics from tcpreplay output")
+            raise GeneratorException("unable to parse statistics from tcpreplay output")
+
+        pkts = int(pkts)
+        bts = int(bts)
+        start_time = cls._parse_time(start_time)
+        end_time = cls._parse_time(end_time)
 
         return GeneratorStats(pkts, bts, start_time, end_time)
 
+    def stats_stream(self, poll_interval: float = 1.0) -> Iterator[GeneratorStats]:
+        """Continuously read statistics of running tcpreplay started by ``start`` method.
+
+        Statistics are printed periodically when tcpreplay is started with ``stats_interval``,
+        otherwise after each loop. Iteration ends when tcpreplay stops, last item contains final statistics.
+        Supported only when traffic is replayed by single tcpreplay process (shard).
+
+        Parameters
+        ----------
+        poll_interval : float, optional
+            Time in seconds to wait for new output of tcpreplay.
+
+        Yields
+        ------
+        GeneratorStats
+            Statistics of packets and bytes sent so far. End time is the time of statistics snapshot.
+
+        Raises
+        ------
+        RuntimeError
+            If traffic is replayed by multiple tcpreplay processes.
+        """
+
+        if not self._processes:
+            return
+
+        if len(self._processes) > 1:
+            raise RuntimeError("Statistics stream is supported only with single tcpreplay process.")
+
+        process = self._processes[0]
+        start_time = None
+        buffer = ""
+        with open(self._log_files[0], encoding="utf-8") as log:
+            while True:
+                # check state before reading, so output written before process exit is not lost
+                running = process.is_running()
+                buffer += log.readline()
+                if not buffer.endswith("\n"):
+                    if not running:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                line, buffer = buffer, ""
+                if start_time is None:
+                    match = _STATS_RE.search(line)
+                    if match and match.lastgroup == "start":
+                        start_time = self._parse_time(match.group("start"))
+                    continue
+
+                match = _PROGRESS_RE.search(line)
+                if match:
+                    yield GeneratorStats(
+                        int(match.group("packets")),
+                        int(match.group("bytes")),
+                        start_time,
+                        start_time + int(float(match.group("seconds")) * 1000),
+                    )
+
     def stop(self, timeout=None):
         """Stop current execution of tcpreplay.
 
@@ -285,19 +481,26 @@ class TcpReplay(PcapPlayer):
             Tcpreplay process exited unexpectedly with an error.
         """
 
-        if self._process is None:
-            return
+        error = None
+        for process in self._processes:
+            try:
+                process.wait_or_kill(timeout)
+            except ExecutableProcessError as err:
+                error = error or err
 
-        try:
-            self._process.wait_or_kill(timeout)
-        except ExecutableProcessError as err:
-            raise GeneratorException("tcpreplay runtime error") from err
+        if error:
+            raise GeneratorException("tcpreplay runtime error") from error
 
     def cleanup(self) -> None:
         """Clean any artifacts created by the connector or the tcpreplay itself."""
 
-        Path(self._log_file).unlink()
-        self._rsync.remove_path(self._pcap_path)
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+        if self._pcap_rsync:
+            Tool(["rm", "-rf", self._pcap_rsync.get_data_directory()], executor=self._executor).run()
+            self._pcap_rsync = None
+        self._pushed_pcaps = {}
+        # rsync to directory on host owned by this instance, created with first pushed pcap
+        self._pcap_rsync = None
 
     def download_logs(self, directory: str):
         """Download logs from tcpreplay.
@@ -309,10 +512,354 @@ class TcpReplay(PcapPlayer):
         """
 
         Path(directory).mkdir(parents=True, exist_ok=True)
-        shutil.copy(self._log_file, directory)
+        for log_file in self._log_files:
+            shutil.copy(log_file, directory)
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Forget tools and their features found on hosts. Tools are looked up again by the next created instance."""
+
+        cls._tool_paths.clear()
+        cls._netmap_support.clear()
+
+    @classmethod
+    def _get_tool_path(cls, tool: str, executor, required: bool = False) -> Optional[str]:
+        """Find tool on host. Result is cached per host and shared by all instances.
+
+        Parameters
+        ----------
+        tool : str
+            Name of tool/binary to find.
+        executor : Executor
+            Executor for command execution.
+        required : bool, optional
+            If True, missing tool is an error.
+
+        Returns
+        -------
+        str or None
+            Absolute path to tool. None if tool is missing.
+
+        Raises
+        ------
+        RuntimeError
+            If required tool is not installed on host.
+        """
+
+        key = (executor.get_host(), tool)
+        if key not in cls._tool_paths:
+            if required:
+                cls._tool_paths[key] = assert_tool_is_installed(tool, executor)
+            else:
+                cls._tool_paths[key] = get_tool_path(tool, executor)
+
+        return cls._tool_paths[key]
+
+    @classmethod
+    def _netmap_supported(cls, executor) -> bool:
+        """Check whether tcpreplay on host supports netmap injection method.
+        Result is cached per host and shared by all instances.
+
+        Parameters
+        ----------
+        executor : Executor
+            Executor for command execution.
+
+        Returns
+        -------
+        bool
+            True if netmap is supported.
+        """
+
+        host = executor.get_host()
+        if host not in cls._netmap_support:
+            cmd = Tool("tcpreplay -V", failure_verbosity="no-exception", executor=executor)
+            stdout, stderr = cmd.run()
+            # builds without netmap print "Not compiled with netmap"
+            cls._netmap_support[host] = cmd.returncode() == 0 and bool(
+                re.search(r"Optional injection method: .*netmap", stdout + stderr)
+            )
+
+        if not cls._netmap_support[host]:
+            logging.getLogger().warning(
+                "tcpreplay on host %s does not support netmap, standard injection method is used.", host
+            )
+
+        return cls._netmap_support[host]
+
+    def _configure_interface(self, interface: _ReplayInterface) -> None:
+        """Bring interface up and set its mtu. Interface is left untouched if it is already in desired state.
+
+        Parameters
+        ----------
+        interface : _ReplayInterface
+            Replaying interface.
+        """
+
+        cmd = Tool(f"ip -j link show dev {interface.name}", failure_verbosity="no-exception", executor=self._executor)
+        stdout, _ = cmd.run()
+
+        link = {}
+        if cmd.returncode() == 0:
+            try:
+                link = json.loads(stdout)[0]
+            except (ValueError, IndexError):
+                pass
+
+        # operstate of some interfaces is UNKNOWN even if they are up, administrative state is in flags
+        if "UP" not in link.get("flags", []) or link.get("mtu") != self._mtu:
+            # interface state and mtu are set with single command to save a round trip to the host
+            Tool(f"ip link set dev {interface.name} up mtu {self._mtu}", executor=self._executor, sudo=True).run()
+
+        interface.configured = True
+
+    def _prepare_cmd(self, interface: _ReplayInterface) -> None:
+        """Prepare part of tcpreplay command and rewrite rules which are same for all runs on the interface.
+
+        Parameters
+        ----------
+        interface : _ReplayInterface
+            Replaying interface.
+        """
+
+        binary = self._bin
+        cmd_options = []
+        interface.rewrite_rules = None
+        if interface.dst_mac or self._vlan is not None:
+            if self._bin_edit:
+                binary = self._bin_edit
+                cmd_options += self._get_edit_args(interface.dst_mac)
+            else:
+                interface.rewrite_rules = RewriteRules()
+                if interface.dst_mac:
+                    interface.rewrite_rules.edit_dst_mac = interface.dst_mac
+                if self._vlan is not None:
+                    interface.rewrite_rules.add_vlan = self._vlan
+
+        cmd_options += ["--preload-pcap"]  # always preload pcap file
+        if self._netmap:
+            cmd_options += ["--netmap"]
+        cmd_options += [f"--intf1={interface.name}"]
+        if self._verbose:
+            cmd_options += ["-v"]
+
+        interface.cmd_prefix = f"{binary} {' '.join(cmd_options)}"
+
+    def _run(self, idx: int, cmd: str) -> None:
+        """Start tcpreplay process.
+
+        Parameters
+        ----------
+        idx : int
+            Index of tcpreplay process (shard).
+        cmd : str
+            Tcpreplay command.
+
+        Raises
+        ------
+        GeneratorException
+            Tcpreplay process exited unexpectedly with an error.
+        """
+
+        log_file = Path(self._work_dir, "tcpreplay.log" if idx == 0 else f"tcpreplay_{idx}.log")
+        process = AsyncTool(cmd, sudo=True, executor=self._executors[idx])
+        process.set_outputs(log_file)
+        self._processes.append(process)
+        self._log_files.append(log_file)
+
+        try:
+            process.run()
+        except ExecutableProcessError as err:
+            raise GeneratorException("tcpreplay startup error") from err
+
+    def _split(self, pcap_path: str, shards: int) -> list[str]:
+        """Split pcap file by flows into shards. Split pcaps are kept in working directory
+        and reused while the source pcap and number of shards do not change.
+
+        Parameters
+        ----------
+        pcap_path : str
+            Local path to pcap file.
+        shards : int
+            Number of shards.
+
+        Returns
+        -------
+        list
+            Local paths to pcap files of shards.
+        """
+
+        source = Path(pcap_path).resolve()
+        stat = source.stat()
+        key = (str(source), stat.st_mtime_ns, stat.st_size, shards)
+
+        if self._split_pcap and self._split_pcap[0] == key and all(Path(p).exists() for p in self._split_pcap[1]):
+            return self._split_pcap[1]
+
+        output_dir = Path(self._work_dir, "shards")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_dir.mkdir()
+        shard_paths = split_pcap(pcap_path, shards, str(output_dir))
+        self._split_pcap = (key, shard_paths)
+
+        return shard_paths
+
+    def _rewrite_pcap(self, pcap_path: str, rules: RewriteRules) -> str:
+        """Rewrite pcap file with scapy rewriter. Rewritten pcap is kept in working directory
+        and reused while the source pcap and rules do not change.
+
+        Name of rewritten pcap contains the rules, so it never collides with the source
+        pcap or its variants rewritten by other rules when pushed to host.
+
+        Parameters
+        ----------
+        pcap_path : str
+            Local path to pcap file.
+        rules : RewriteRules
+            Packet rewriting rules.
+
+        Returns
+        -------
+        str
+            Local path to rewritten pcap file.
+        """
+
+        source = Path(pcap_path).resolve()
+        stat = source.stat()
+        key = (str(source), stat.st_mtime_ns, stat.st_size, rules.add_vlan, rules.edit_dst_mac)
+
+        output_path = self._rewritten_pcaps.get(key)
+        if output_path and Path(output_path).exists():
+            return output_path
+
+        output_dir = Path(self._work_dir, "rewritten")
+        output_dir.mkdir(exist_ok=True)
+        mac = rules.edit_dst_mac.replace(":", "") if rules.edit_dst_mac else "none"
+        vlan = rules.add_vlan if rules.add_vlan is not None else "none"
+        output_name = f"{source.stem}_mac-{mac}_vlan-{vlan}{source.suffix}"
+        output_path = rewrite_pcap(pcap_path, rules, str(output_dir / output_name))
+        # pcap with the same name (from other directory) overwrites previously rewritten file
+        self._rewritten_pcaps = {
+            cached_key: path for cached_key, path in self._rewritten_pcaps.items() if path != output_path
+        }
+        self._rewritten_pcaps[key] = output_path
+
+        return output_path
+
+    def _push_pcap(self, pcap_path: str) -> str:
+        """Synchronize pcap file on (remote) host. Pcap file is pushed again only if it was modified
+        since the last synchronization.
+
+        Pcaps are pushed to directory used only by this instance, shared rsync data directory
+        could be modified or wiped by other users and the cached pcaps would not match.
+
+        Parameters
+        ----------
+        pcap_path : str
+            Local path to pcap file.
+
+        Returns
+        -------
+        str
+            Path to pcap file on (remote) host.
+        """
+
+        local_path = str(Path(pcap_path).resolve())
+        stat = Path(local_path).stat()
+
+        cached = self._pushed_pcaps.get(local_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        if self._pcap_rsync is None:
+            stdout, _ = Tool(["mktemp", "-d", "-t", "tcpreplay.XXXXXX"], executor=self._executor).run()
+            self._pcap_rsync = Rsync(self._executor, data_dir=stdout.strip())
+
+        remote_path = self._pcap_rsync.push_path(pcap_path)
+        # pcap with the same name overwrites previously pushed file on host
+        self._pushed_pcaps = {key: value for key, value in self._pushed_pcaps.items() if value[2] != remote_path}
+        self._pushed_pcaps[local_path] = (stat.st_mtime_ns, stat.st_size, remote_path)
+
+        return remote_path
+
+    def _get_edit_args(self, dst_mac: Optional[str]) -> list[str]:
+        """Prepare tcpreplay-edit arguments to rewrite replayed packets.
+
+        Parameters
+        ----------
+        dst_mac : str, optional
+            Destination mac address set in replayed packets.
+
+        Returns
+        -------
+        list
+            Tcpreplay-edit arguments.
+        """
+
+        args = []
+        if dst_mac:
+            args += [f"--enet-dmac={dst_mac}"]
+        if self._vlan is not None:
+            args += ["--enet-vlan=add", f"--enet-vlan-tag={self._vlan}", "--enet-vlan-cfi=0", "--enet-vlan-pri=0"]
+
+        return args
 
     @staticmethod
-    def _get_speed_arg(speed: ReplaySpeed) -> str:
+    def _parse_time(time_str: str) -> int:
+        """Convert timestamp from tcpreplay output to milliseconds since epoch.
+
+        Parameters
+        ----------
+        time_str : str
+            Timestamp in ISO format with nanosecond precision.
+
+        Returns
+        -------
+        int
+            Milliseconds since epoch.
+        """
+
+        # reduce nanosec precision to microsec precision
+        timestamp = datetime.datetime.fromisoformat(time_str.strip()[:26])
+        return int(timestamp.timestamp() * 1000)
+
+    @staticmethod
+    def _split_speed(speed: ReplaySpeed, count: int) -> list[ReplaySpeed]:
+        """Divide constant rate replay speed among tcpreplay processes (shards).
+        Relative speed modifiers (multiplier, topspeed) are same for all shards.
+
+        Parameters
+        ----------
+        speed : ReplaySpeed
+            Replay speed modifier of whole traffic.
+        count : int
+            Number of shards.
+
+        Returns
+        -------
+        list
+            Replay speed modifier of each shard.
+
+        Raises
+        ------
+        RuntimeError
+            If packets per second speed is lower than number of shards.
+        """
+
+        if isinstance(speed, PpsSpeed):
+            if speed.speed < count:
+                logging.getLogger().error("packets per second speed is lower than number of shards")
+                raise RuntimeError("packets per second speed is lower than number of shards")
+            # remainder is distributed to first shards, so the total rate is exact
+            return [PpsSpeed(speed.speed // count + (idx < speed.speed % count)) for idx in range(count)]
+
+        if isinstance(speed, MbpsSpeed):
+            return [MbpsSpeed(speed.speed / count)] * count
+
+        return [speed] * count
+
+    @classmethod
+    def _get_speed_arg(cls, speed: ReplaySpeed) -> str:
         """Prepare tcpreplay argument according to given replay speed modifier.
 
         Parameters
@@ -331,15 +878,11 @@ class TcpReplay(PcapPlayer):
             If speed parameter has unsupported type.
         """
 
-        if isinstance(speed, MultiplierSpeed):
-            param_name = "multiplier"
-        elif isinstance(speed, MbpsSpeed):
-            param_name = "mbps"
-        elif isinstance(speed, PpsSpeed):
-            param_name = "pps"
-        elif isinstance(speed, TopSpeed):
-            param_name = "topspeed"
-        else:
+        param_name = cls._SPEED_ARGS.get(type(speed))
+        if param_name is None:
             raise TypeError("Unsupported speed type.")
 
-        return f"--{param_name}{speed.speed and f'={speed.speed}'}"
+        if speed.speed is None:
+            return f"--{param_name}"
+
+        return f"--{param_name}={speed.speed}"
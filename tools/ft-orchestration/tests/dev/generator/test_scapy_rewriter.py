@@ -11,8 +11,18 @@ import logging
 import tempfile
 from os import path
 
+from scapy.layers.inet import IP, UDP, fragment
+from scapy.layers.inet6 import IPv6, IPv6ExtHdrFragment, fragment6
+from scapy.layers.l2 import Ether
+from scapy.packet import Raw
 from scapy.utils import rdpcap
-from src.generator.scapy_rewriter import RewriteRules, rewrite_pcap
+from src.generator.scapy_rewriter import (
+    RewriteRules,
+    edit_packet,
+    flow_hash,
+    rewrite_pcap,
+    split_pcap,
+)
 
 PCAP_DIR = path.dirname(path.realpath(__file__))
 PCAP_REF_DIR = path.join(path.dirname(path.realpath(__file__)), "ref")
@@ -54,6 +64,25 @@ def test_scapy_rewriter_edit_dst_mac():
     assert not path.exists(temp_dir)
 
 
+def test_scapy_rewriter_edit_dst_mac_in_place():
+    """Test of destination mac replace by patching pcap bytes. Result must match packets edited by scapy."""
+
+    rules = RewriteRules(edit_dst_mac="aa:bb:cc:dd:00:01")
+    source = path.join(PCAP_DIR, "NTP_sync.pcap")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pcap_path = rewrite_pcap(source, rules, path.join(temp_dir, "out.pcap"))
+
+        # only destination mac addresses are changed, file size and timestamps are preserved
+        assert path.getsize(pcap_path) == path.getsize(source)
+        packets = rdpcap(pcap_path)
+        ref_packets = [edit_packet(packet, rules) for packet in rdpcap(source)]
+        assert len(packets) == len(ref_packets)
+        for packet, ref_packet in zip(packets, ref_packets):
+            assert bytes(packet) == bytes(ref_packet)
+            assert packet.time == ref_packet.time
+
+
 def test_scapy_rewriter_edit_vlan():
     """Test of add vlan tag feature."""
 
@@ -78,3 +107,46 @@ def test_scapy_rewriter_edit_dst_mac_add_vlan():
         )
         assert compare_ref(pcap_path, path.join(PCAP_REF_DIR, "ipv6-routing-header-dst-mac-vlan.pcap"))
     assert not path.exists(temp_dir)
+
+
+def test_scapy_rewriter_split():
+    """Test of splitting pcap by flows."""
+
+    source = path.join(PCAP_DIR, "NTP_sync.pcap")
+    source_packets = rdpcap(source)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shard_paths = split_pcap(source, 4, temp_dir)
+        shards = [rdpcap(shard_path) for shard_path in shard_paths]
+
+        assert len(shards) > 1
+        assert sum(len(shard) for shard in shards) == len(source_packets)
+
+        # directions of flows (source and destination endpoint, protocol) found in each shard
+        directions = [
+            {
+                ((packet[IP].src, packet[UDP].sport), (packet[IP].dst, packet[UDP].dport), packet[IP].proto)
+                for packet in shard
+            }
+            for shard in shards
+        ]
+        # 15 NTP flows and 1 DNS flow, each in both directions
+        assert sum(len(shard_directions) for shard_directions in directions) == 32
+        for shard_directions in directions:
+            for src, dst, proto in shard_directions:
+                # reverse direction of the flow must be in the same shard
+                assert (dst, src, proto) in shard_directions
+
+
+def test_scapy_rewriter_flow_hash_fragments():
+    """Test that all fragments of datagram have the same flow hash, although only the first contains ports."""
+
+    packet = IP(src="192.168.0.1", dst="192.168.0.2") / UDP(sport=1234, dport=53) / Raw(b"x" * 3000)
+    fragments = [Ether(dst="aa:bb:cc:dd:00:01") / frag for frag in fragment(packet, fragsize=800)]
+    assert len(fragments) > 1
+    assert len({flow_hash(Ether(bytes(frag))) for frag in fragments}) == 1
+
+    packet = IPv6(src="::1", dst="::2") / IPv6ExtHdrFragment() / UDP(sport=1234, dport=53) / Raw(b"x" * 3000)
+    fragments = [Ether(dst="aa:bb:cc:dd:00:01") / frag for frag in fragment6(packet, 1280)]
+    assert len(fragments) > 1
+    assert len({flow_hash(Ether(bytes(frag))) for frag in fragments}) == 1
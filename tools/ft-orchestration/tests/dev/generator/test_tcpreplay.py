@@ -1,3 +1,4 @@
+# pylint: disable=protected-access
 """
 Author(s): Dominik Tran <tran@cesnet.cz>
 
@@ -13,7 +14,13 @@ import time
 import pytest
 from lbr_testsuite.executable import RemoteExecutor
 from lbr_testsuite.executable.remote_executor import ssh_agent_enabled
-from src.generator.interface import GeneratorException
+from src.generator.interface import (
+    GeneratorException,
+    MbpsSpeed,
+    MultiplierSpeed,
+    PpsSpeed,
+    TopSpeed,
+)
 from src.generator.tcpreplay import TcpReplay
 
 HOST = os.environ.get("PYTEST_TEST_HOST")
@@ -94,6 +101,18 @@ def test_tcpreplay_local(require_root):
     assert stats.bytes == 3315
 
 
+@pytest.mark.dev
+def test_tcpreplay_local_shards(require_root):
+    """Test tcpreplay on local machine with traffic replayed by multiple processes."""
+
+    tcpreplay = TcpReplay()
+    tcpreplay.add_interface("lo")
+    tcpreplay.start(PCAP_FILE, shards=2)
+    stats = tcpreplay.stats()
+    assert stats.packets == 32
+    assert stats.bytes == 3315
+
+
 @pytest.mark.dev
 @pytest.mark.parametrize("connection_parameters", parametrize_remote_connection(), ids=connection_ids())
 def test_tcpreplay_remote(connection_parameters, require_root):
@@ -195,3 +214,66 @@ def test_tcpreplay_edit_remote_dst_mac(connection_parameters, require_root):
     stats = tcpreplay.stats()
     assert stats.packets == 32
     assert stats.bytes == 3315
+
+
+def test_tcpreplay_speed_arg():
+    """Test conversion of replay speed modifiers to tcpreplay arguments."""
+
+    assert TcpReplay._get_speed_arg(MultiplierSpeed(2.0)) == "--multiplier=2.0"
+    assert TcpReplay._get_speed_arg(MbpsSpeed(100)) == "--mbps=100"
+    assert TcpReplay._get_speed_arg(PpsSpeed(1000)) == "--pps=1000"
+    assert TcpReplay._get_speed_arg(TopSpeed()) == "--topspeed"
+
+
+
+def test_tcpreplay_split_speed():
+    """Test dividing of replay speed among tcpreplay processes (shards)."""
+
+    assert TcpReplay._split_speed(PpsSpeed(1001), 2) == [PpsSpeed(501), PpsSpeed(500)]
+    assert TcpReplay._split_speed(MbpsSpeed(100), 4) == [MbpsSpeed(25.0)] * 4
+    assert TcpReplay._split_speed(MultiplierSpeed(2.0), 2) == [MultiplierSpeed(2.0)] * 2
+    assert TcpReplay._split_speed(TopSpeed(), 2) == [TopSpeed()] * 2
+    with pytest.raises(RuntimeError):
+        TcpReplay._split_speed(PpsSpeed(1), 2)
+
+
+TCPREPLAY_LOG = """\
+Test start: 2023-01-17 14:40:26.402470123 ...
+Actual: 32 packets (3315 bytes) sent in 30.00 seconds
+Rated: 110.4 Bps, 0.000 Mbps, 1.06 pps
+Test start: 2023-01-17 14:40:56.404128000 ...
+Actual: 32 packets (3315 bytes) sent in 30.00 seconds
+Rated: 110.4 Bps, 0.000 Mbps, 1.06 pps
+Test complete: 2023-01-17 14:41:26.405786000
+Actual: 64 packets (6630 bytes) sent in 60.00 seconds
+Rated: 110.4 Bps, 0.000 Mbps, 1.06 pps
+Flows: 16 flows, 0.26 fps, 64 unique flow packets, 0 unique non-flow packets
+Statistics for network device: lo
+\tSuccessful packets:        64
+\tFailed packets:            0
+Test complete: 2023-01-17 14:41:27.001234000
+"""
+
+
+def test_tcpreplay_parse_stats(tmp_path):
+    """Test parsing of tcpreplay output replayed in loops. Total statistics are printed last."""
+
+    log_file = tmp_path / "tcpreplay.log"
+    log_file.write_text(TCPREPLAY_LOG, encoding="utf-8")
+
+    stats = TcpReplay._parse_stats(log_file)
+    assert stats.packets == 64
+    assert stats.bytes == 6630
+    assert stats.start_time == TcpReplay._parse_time("2023-01-17 14:40:26.402470")
+    assert stats.end_time == TcpReplay._parse_time("2023-01-17 14:41:26.405786")
+    assert stats.end_time - stats.start_time == 60003
+
+
+def test_tcpreplay_parse_stats_truncated(tmp_path):
+    """Test parsing of tcpreplay output which ended before statistics were printed."""
+
+    log_file = tmp_path / "tcpreplay.log"
+    log_file.write_text(TCPREPLAY_LOG.split("Test complete", maxsplit=1)[0], encoding="utf-8")
+
+    with pytest.raises(GeneratorException):
+        TcpReplay._parse_stats(log_file)
@@ -44,7 +44,7 @@ def fixture_get_generator(create_config):
 @pytest.mark.skip("Need a specific tcpreplay generator. Use it as a template.")
 def test_download(gen):
     """Test download_logs and cleanup"""
-    print(f"_log_file: {gen._log_file}")
+    print(f"_log_files: {gen._log_files}")
     logs_gen = "logs/generator"
     gen.add_interface("ens2f1", "40:a6:b7:30:6e:c4")
     gen.start(PCAP_FILE)